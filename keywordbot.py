@@ -1,80 +1,516 @@
 import logging
 from telegram import Update, ChatPermissions
-from telegram.ext import Application, MessageHandler, CommandHandler, filters, ContextTypes
-from telegram.error import BadRequest, InvalidToken, Forbidden
-import json
+from telegram.ext import Application, MessageHandler, CommandHandler, ChatMemberHandler, filters, ContextTypes
+from telegram.error import BadRequest, InvalidToken, Forbidden, RetryAfter
+from telegram.request import HTTPXRequest
+import orjson
 import os
 import asyncio
-from datetime import datetime, timedelta
+import functools
+import importlib.util
+import sys
+import re
+import shutil
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+try:
+    import ahocorasick
+except ImportError:
+    # Fall back to plain substring scans when the C extension is unavailable
+    ahocorasick = None
+
+try:
+    import hyperscan
+except ImportError:
+    # Optional SIMD multi-pattern engine; preferred over ahocorasick when installed
+    hyperscan = None
+
+# Below this many keywords a C-level `in` loop beats walking the automaton
+AUTOMATON_MIN_KEYWORDS = 32
+# Compiled matchers kept in memory at once; least recently used topics are evicted first
+MATCHER_CACHE_SIZE = 256
+# Journal entries written between full snapshots of bot_config.json
+COMPACT_EVERY = 500
+# Journal ops fsynced as they are appended. These are rare, hand-made admin changes that can't
+# be reconstructed; mute/unmute/flag entries are written on every keyword hit and are only
+# flushed to the OS, so a machine crash may lose the latest few of them (Telegram still
+# enforces the mute itself, and an overdue unmute simply runs again)
+DURABLE_OPS = frozenset({"add_keyword", "remove_keyword", "add_admin", "remove_admin"})
+# Seconds a get_chat_member result is trusted before asking Telegram again
+TG_ADMIN_TTL = 300
+# get_chat_member results kept at once; least recently used (chat, user) pairs are evicted first
+MEMBER_CACHE_SIZE = 2048
+# How long a keyword hit mutes a regular user
+MUTE_SECONDS = 12 * 3600
+# Parent messages whose replies are remembered, so a deleted message can take its replies along
+REPLY_INDEX_SIZE = 10_000
+# Bot API requests allowed in flight at once; bursts queue here instead of tripping flood limits
+API_CONCURRENCY = 20
+
+# HTTP/2 lets concurrent API calls share one connection; httpx needs the h2 package for it
+HTTP_VERSION = "2" if importlib.util.find_spec("h2") is not None else "1.1"
+
+# Permission sets sent with every mute/unmute; built once since they never change
+_MUTE_PERMS = ChatPermissions(
+    can_send_messages=False,
+    can_send_media_messages=False,
+    can_send_polls=False,
+    can_send_other_messages=False,
+    can_add_web_page_previews=False,
+    can_change_info=False,
+    can_invite_users=False,
+    can_pin_messages=False,
+    can_manage_topics=False
+)
+_UNMUTE_PERMS = ChatPermissions(
+    can_send_messages=True,
+    can_send_media_messages=True,
+    can_send_polls=True,
+    can_send_other_messages=True,
+    can_add_web_page_previews=True,
+    can_change_info=True,
+    can_invite_users=True,
+    can_pin_messages=True,
+    can_manage_topics=True
+)
 
-# Configure logging with more detailed output
+# Reply for each admin-only command when a non-admin invokes it
+_ADMIN_DENIALS = {
+    "add_keyword": "❌ Only bot admins can configure keyword filters.",
+    "remove_keyword": "❌ Only bot admins can configure keyword filters.",
+    "list_keywords": "❌ Only bot admins can view keyword lists.",
+    "add_admin": "❌ Only existing bot admins can add new admins.",
+    "list_admins": "❌ Only bot admins can view admin list.",
+    "remove_admin": "❌ Only bot admins can remove other admins.",
+    "unmute": "❌ Only bot admins can unmute users.",
+    "check_mutes": "❌ Only bot admins can check muted users.",
+    "debug": "❌ Only bot admins can use debug command.",
+    "test_permissions": "❌ Only bot admins can test permissions.",
+    "clear_flagged": "❌ Only bot admins can clear flagged messages.",
+}
+
+# Chat/thread id -> str for the message hot path; cached strings also keep their hash
+_sid = functools.lru_cache(maxsize=8192)(str)
+
+# Quiet by default so the per-message debug/info records are dropped before formatting;
+# set LOG_LEVEL=INFO or LOG_LEVEL=DEBUG for more detail
 logging.basicConfig(
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    level=logging.DEBUG
+    level=os.getenv("LOG_LEVEL", "WARNING").upper()
 )
 logger = logging.getLogger(__name__)
 
+# Static replies, built once at import
+START_TEXT = (
+    "🤖 <b>Topic Keyword Filter Bot</b>\n\n"
+    "I can mute users for using specific keywords in designated topics!\n\n"
+    "Use /help to see available commands."
+)
+
+HELP_TEXT = """
+🤖 <b>Topic Keyword Filter Bot Commands:</b>
+
+<b>For Admins:</b>
+• /add_keyword &lt;topic_id&gt; &lt;keyword&gt; - Add a keyword to filter
+• /remove_keyword &lt;topic_id&gt; &lt;keyword&gt; - Remove a keyword
+• /list_keywords [topic_id] - List keywords (all or specific topic/chat)
+• /add_admin &lt;user_id&gt; - Add a user as bot admin
+• /forceaddadmin &lt;user_id&gt; - Forcefully add admin (restricted access)
+• /list_admins - Show all bot admins
+• /remove_admin &lt;user_id&gt; - Remove admin
+• /unmute &lt;user_id&gt; - Manually unmute a user
+• /check_mutes - Check currently muted users
+• /debug - Show debug information about current chat
+• /test_permissions - Test bot permissions
+• /clear_flagged - Clear flagged messages tracking
+
+<b>Features:</b>
+• Regular users get muted for 12 hours when using filtered keywords
+• Bot admins: no restrictions applied
+• Telegram admins: no restrictions applied
+• Automatic unmuting after 12 hours
+• Deletes original message AND all replies to it
+
+<b>Notes:</b>
+• Bot must be admin with restrict and delete permissions
+• Keywords are case-insensitive
+• For supergroups with topics: use topic ID from URL or /debug
+• For general chat in supergroups: often topic ID 1 or use /debug to confirm
+"""
+
 class TopicKeywordBot:
     def __init__(self, token):
         self.token = token.strip()
-        self.app = Application.builder().token(self.token).build()
+        self.app = (
+            Application.builder()
+            .token(self.token)
+            # Pool sized for API_CONCURRENCY in-flight calls; getUpdates long-polls on its own client
+            # so it never holds a slot the API calls need
+            .request(HTTPXRequest(
+                connection_pool_size=64,
+                http_version=HTTP_VERSION,
+                read_timeout=20,
+                write_timeout=20,
+                connect_timeout=10,
+            ))
+            .get_updates_request(HTTPXRequest(http_version=HTTP_VERSION))
+            .concurrent_updates(True)
+            .post_init(self.startup)
+            .post_shutdown(self.stop_config_writer)
+            .build()
+        )
+        # Chats with keywords or flagged messages; kept in sync by apply_op (see refresh_active_chats)
+        self._chat_filter = filters.Chat()
+        # Bot admins, mirroring _admin_set; admin-only commands are dispatched only for these users
+        self._admin_filter = filters.User()
         self.setup_handlers()
         self.config_file = "bot_config.json"
+        self.journal_file = "bot_config.log"
+        self._automata = OrderedDict()  # (chat_id, topic_id, version) -> compiled keyword matcher
+        self._topic_versions = {}  # (chat_id, topic_id) -> bumped on every keyword change
+        self._dirty = asyncio.Event()  # set when the journal is due for compaction
+        self._stopping = False
+        self._writer_task = None
+        self._journal_entries = 0
+        self._reply_index = OrderedDict()  # (chat_id, message_id) -> ids of replies to it, oldest parent first
+        self._member_cache = OrderedDict()  # (chat_id, user_id) -> (ChatMember, checked_at)
+        self._background_tasks = set()  # strong refs so fire-and-forget tasks aren't collected
+        self._api_sem = asyncio.Semaphore(API_CONCURRENCY)  # bounds in-flight Telegram requests
         self.load_config()
 
     def load_config(self):
         try:
-            with open(self.config_file, 'r') as f:
-                self.config = json.load(f)
+            with open(self.config_file, 'rb') as f:
+                self.config = orjson.loads(f.read())
+        except FileNotFoundError:
+            # Fresh install
+            self.config = self.config_defaults({})
+            self._encode_and_write(self.config)
+        except orjson.JSONDecodeError as e:
+            # Never start from defaults over a damaged file: the next snapshot would erase it
+            backup = self.config_file + ".bad"
+            shutil.copyfile(self.config_file, backup)
+            logger.critical("%s is corrupt (%s); copied to %s", self.config_file, e, backup)
+            raise RuntimeError(f"{self.config_file} is corrupt; fix or remove it and restart (copy saved to {backup})") from e
+        # Older files may lack sections; fill them in once so lookups can index directly
+        self.config_defaults(self.config)
+        if self.migrate_muted_users():
+            self._encode_and_write(self.config_snapshot())
+        # Keywords are sets in memory and sorted lists on disk (see config_snapshot); files
+        # written before keywords were casefolded may still hold merely lowercased ones
+        for topics in self.config["topic_keywords"].values():
+            for topic_id, keywords in topics.items():
+                topics[topic_id] = {sys.intern(kw.casefold()) for kw in keywords}
+        # Kept as a list on disk; the set gives O(1) lookups on the hot path
+        self._admin_set = set(self.config["admin_users"])
+        self._admin_filter.user_ids = self._admin_set
+        self.refresh_keyword_index()
+        # Changes made after the last snapshot live in the journal
+        self.replay_journal()
+        self.drop_torn_tail(self.journal_file)
+        self._journal = open(self.journal_file, 'ab')
+
+    @staticmethod
+    def config_defaults(config: dict) -> dict:
+        """Ensure every top-level config section exists"""
+        config.setdefault("topic_keywords", {})
+        config.setdefault("admin_users", [])
+        config.setdefault("muted_users", {})
+        config.setdefault("flagged_messages", {})  # Store flagged message IDs to track replies
+        return config
+
+    def migrate_muted_users(self) -> bool:
+        """Convert flat {"chat_user": iso_time} mutes to {chat_id: {user_id: epoch}}; True if changed"""
+        muted = self.config["muted_users"]
+        legacy = {key: value for key, value in muted.items() if not isinstance(value, dict)}
+        if not legacy:
+            return False
+        for mute_key, unmute_time_str in legacy.items():
+            del muted[mute_key]
+            # Chat ids may be negative but never contain "_", so split on the last one
+            chat_id, user_id = mute_key.rsplit("_", 1)
+            muted.setdefault(chat_id, {})[user_id] = datetime.fromisoformat(unmute_time_str).timestamp()
+        logger.info("Migrated %s mutes to the per-chat layout", len(legacy))
+        return True
+
+    def refresh_keyword_index(self):
+        """Rebuild the flat (chat_id, topic_id) -> keywords index of topics with at least one keyword"""
+        # Values are the same set objects held in the config, not copies
+        self._resolved = {
+            (chat_id, topic_id): keywords
+            for chat_id, topics in self.config["topic_keywords"].items()
+            for topic_id, keywords in topics.items()
+            if keywords
+        }
+        self.refresh_active_chats()
+
+    def refresh_active_chats(self):
+        """Rebuild the chat filter that decides which chats reach filter_message at all"""
+        # A chat matters if it has keywords or flagged messages whose replies must be blocked
+        chat_ids = {int(chat_id) for chat_id, _ in self._resolved}
+        chat_ids.update(int(key.rsplit("_", 1)[0]) for key in self.config["flagged_messages"])
+        self._chat_filter.chat_ids = chat_ids
+
+    def replay_journal(self):
+        """Apply journal entries on top of the loaded snapshot, oldest file first"""
+        for path in (self.journal_file + ".1", self.journal_file):
+            try:
+                f = open(path, 'rb')
+            except FileNotFoundError:
+                continue
+            with f:
+                for line in f:
+                    try:
+                        entry = orjson.loads(line)
+                    except orjson.JSONDecodeError:
+                        # A crash mid-append can leave a torn last line
+                        logger.warning("Skipping unreadable journal entry in %s", path)
+                        continue
+                    self.apply_op(entry)
+                    self._count_journal_entry()
+
+    @staticmethod
+    def drop_torn_tail(path: str):
+        """Truncate a journal after its last complete line
+
+        A crash mid-append leaves a fragment without a trailing newline; replay already
+        skips it, but appending after it would glue the next entry onto the same line.
+        """
+        try:
+            f = open(path, 'r+b')
         except FileNotFoundError:
-            self.config = {
-                "topic_keywords": {},
-                "admin_users": [],
-                "muted_users": {},
-                "flagged_messages": {}  # New: Store flagged message IDs to track replies
-            }
-            self.save_config()
-
-    def save_config(self):
-        with open(self.config_file, 'w') as f:
-            json.dump(self.config, f, indent=2)
+            return
+        with f:
+            end = f.seek(0, os.SEEK_END)
+            if end == 0:
+                return
+            pos = end
+            while pos > 0:
+                start = max(0, pos - 4096)
+                f.seek(start)
+                chunk = f.read(pos - start)
+                if pos == end and chunk.endswith(b"\n"):
+                    return  # Nothing torn
+                newline = chunk.rfind(b"\n")
+                if newline != -1:
+                    pos = start + newline + 1
+                    break
+                pos = start
+            logger.warning("Dropping %s torn bytes from the end of %s", end - pos, path)
+            f.truncate(pos)
+
+    def apply_op(self, entry: dict):
+        """Apply one config mutation to the in-memory state
+
+        Every op is idempotent, so replaying entries already contained in the snapshot
+        (e.g. after a crash mid-compaction) is harmless.
+        """
+        op = entry["op"]
+        if op == "add_keyword":
+            chat_id, topic_id = entry["chat_id"], entry["topic_id"]
+            kw_set = self.config["topic_keywords"].setdefault(chat_id, {}).setdefault(topic_id, set())
+            kw_set.add(sys.intern(entry["keyword"].casefold()))
+            self._resolved[(chat_id, topic_id)] = kw_set
+            self._chat_filter.add_chat_ids(int(chat_id))
+            self.bump_topic_version(chat_id, topic_id)
+        elif op == "remove_keyword":
+            chat_id, topic_id = entry["chat_id"], entry["topic_id"]
+            # _resolved holds the same set objects as the config, for every non-empty topic
+            kw_set = self._resolved.get((chat_id, topic_id))
+            if kw_set is not None:
+                kw_set.discard(entry["keyword"].casefold())
+                if not kw_set:
+                    self._resolved.pop((chat_id, topic_id), None)
+                    self.refresh_active_chats()
+                self.bump_topic_version(chat_id, topic_id)
+        elif op == "add_admin":
+            if entry["user_id"] not in self._admin_set:
+                self.config["admin_users"].append(entry["user_id"])
+                self._admin_set.add(entry["user_id"])
+                self._admin_filter.add_user_ids(entry["user_id"])
+        elif op == "remove_admin":
+            if entry["user_id"] in self._admin_set:
+                self.config["admin_users"].remove(entry["user_id"])
+                self._admin_set.discard(entry["user_id"])
+                self._admin_filter.remove_user_ids(entry["user_id"])
+        elif op in ("mute", "unmute") and "mute_key" in entry:
+            # Journals written before the per-chat layout: {"mute_key": "chat_user", "until": iso}
+            chat_id, user_id = entry["mute_key"].rsplit("_", 1)
+            upgraded = {"op": op, "chat_id": chat_id, "user_id": user_id}
+            if op == "mute":
+                upgraded["until"] = datetime.fromisoformat(entry["until"]).timestamp()
+            self.apply_op(upgraded)
+        elif op == "mute":
+            self.config["muted_users"].setdefault(entry["chat_id"], {})[entry["user_id"]] = entry["until"]
+        elif op == "unmute":
+            chat_mutes = self.config["muted_users"].get(entry["chat_id"])
+            if chat_mutes is not None:
+                chat_mutes.pop(entry["user_id"], None)
+                if not chat_mutes:
+                    del self.config["muted_users"][entry["chat_id"]]
+        elif op == "flag":
+            self.config["flagged_messages"][entry["flagged_key"]] = entry["message"]
+            self._chat_filter.add_chat_ids(int(entry["flagged_key"].rsplit("_", 1)[0]))
+        elif op == "clear_flagged":
+            self.config["flagged_messages"] = {}
+            self.refresh_active_chats()
+        else:
+            logger.warning("Ignoring unknown config op %r", op)
+
+    def record(self, op: str, **fields):
+        """Apply a config mutation and append it to the journal
+
+        Appending one line keeps each change O(1); the full snapshot is only rewritten
+        every COMPACT_EVERY entries and on shutdown.
+        """
+        entry = {"op": op, **fields}
+        self.apply_op(entry)
+        self._journal.write(orjson.dumps(entry) + b"\n")
+        self._journal.flush()
+        if op in DURABLE_OPS:
+            os.fsync(self._journal.fileno())
+        self._count_journal_entry()
+
+    def _count_journal_entry(self):
+        self._journal_entries += 1
+        if self._journal_entries >= COMPACT_EVERY:
+            self._dirty.set()
+
+    def _encode_and_write(self, snapshot: dict):
+        """Serialize a config snapshot and atomically replace the config file (runs in a worker thread)"""
+        data = orjson.dumps(snapshot, option=orjson.OPT_SORT_KEYS)
+        tmp_file = self.config_file + ".tmp"
+        with open(tmp_file, 'wb') as f:
+            f.write(data)
+            # The data must be on disk before the rename, or a crash can leave an empty file behind
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_file, self.config_file)
+
+    def _write_snapshot(self, snapshot: dict, rotated_file: str):
+        self._encode_and_write(snapshot)
+        # Everything in the rotated journal is part of the snapshot now
+        os.remove(rotated_file)
+
+    def config_snapshot(self):
+        """Return a copy of the config in its on-disk form, with keyword sets as sorted lists
+
+        Every mutable container is copied so the snapshot can be serialized in another
+        thread while handlers keep changing self.config.
+        """
+        snapshot = dict(self.config)
+        snapshot["topic_keywords"] = {
+            chat_id: {topic_id: sorted(keywords) for topic_id, keywords in topics.items()}
+            for chat_id, topics in self.config["topic_keywords"].items()
+        }
+        snapshot["admin_users"] = list(self.config["admin_users"])
+        snapshot["muted_users"] = {
+            chat_id: dict(chat_mutes) for chat_id, chat_mutes in self.config["muted_users"].items()
+        }
+        # Flagged records are never modified once stored, so a shallow copy is enough
+        snapshot["flagged_messages"] = dict(self.config["flagged_messages"])
+        return snapshot
+
+    def _rotate_journal(self) -> str:
+        """Move the current journal aside and start an empty one; returns the rotated path"""
+        rotated_file = self.journal_file + ".1"
+        self._journal.close()
+        if os.path.exists(rotated_file):
+            # A previous compaction did not finish - keep its entries too
+            self.drop_torn_tail(rotated_file)
+            with open(self.journal_file, 'rb') as src, open(rotated_file, 'ab') as dst:
+                dst.write(src.read())
+            os.remove(self.journal_file)
+        else:
+            os.replace(self.journal_file, rotated_file)
+        self._journal = open(self.journal_file, 'ab')
+        self._journal_entries = 0
+        return rotated_file
+
+    async def compact_config(self):
+        """Write a full snapshot and drop the journal entries it contains"""
+        self._dirty.clear()
+        # Snapshot and rotation happen together on the loop, so entries appended while
+        # the snapshot is written go to the new journal and survive
+        snapshot = self.config_snapshot()
+        rotated_file = self._rotate_journal()
+        await asyncio.to_thread(self._write_snapshot, snapshot, rotated_file)
+
+    async def _flush_loop(self):
+        """Compact the journal off the event loop whenever it grows past COMPACT_EVERY"""
+        while True:
+            await self._dirty.wait()
+            if self._journal_entries:
+                try:
+                    await self.compact_config()
+                except Exception as e:
+                    logger.error("Failed to save config: %s", e)
+            else:
+                self._dirty.clear()
+            if self._stopping:
+                return
+
+    async def startup(self, application: Application):
+        await self.start_config_writer(application)
+        self.schedule_pending_unmutes()
+
+    async def start_config_writer(self, application: Application):
+        self._writer_task = asyncio.create_task(self._flush_loop())
+
+    async def stop_config_writer(self, application: Application):
+        # Let the writer finish any in-flight compaction and run a final one
+        self._stopping = True
+        self._dirty.set()
+        if self._writer_task:
+            await self._writer_task
+        self._journal.close()
 
     def setup_handlers(self):
         self.app.add_handler(CommandHandler("start", self.start_command))
         self.app.add_handler(CommandHandler("help", self.help_command))
-        self.app.add_handler(CommandHandler("add_keyword", self.add_keyword_command))
-        self.app.add_handler(CommandHandler("remove_keyword", self.remove_keyword_command))
-        self.app.add_handler(CommandHandler("list_keywords", self.list_keywords_command))
-        self.app.add_handler(CommandHandler("add_admin", self.add_admin_command))
+        self.app.add_handler(CommandHandler("add_keyword", self.add_keyword_command, filters=self._admin_filter))
+        self.app.add_handler(CommandHandler("remove_keyword", self.remove_keyword_command, filters=self._admin_filter))
+        self.app.add_handler(CommandHandler("list_keywords", self.list_keywords_command, filters=self._admin_filter))
+        self.app.add_handler(CommandHandler("add_admin", self.add_admin_command, filters=self._admin_filter))
         self.app.add_handler(CommandHandler("forceaddadmin", self.force_add_admin_command))
-        self.app.add_handler(CommandHandler("list_admins", self.list_admins_command))
-        self.app.add_handler(CommandHandler("remove_admin", self.remove_admin_command))
-        self.app.add_handler(CommandHandler("unmute", self.unmute_command))
-        self.app.add_handler(CommandHandler("check_mutes", self.check_mutes_command))
-        self.app.add_handler(CommandHandler("debug", self.debug_command))
-        self.app.add_handler(CommandHandler("test_permissions", self.test_permissions_command))
-        self.app.add_handler(CommandHandler("clear_flagged", self.clear_flagged_command))
-        # Message filter handler - highest priority
-        self.app.add_handler(MessageHandler(filters.TEXT, self.filter_message), group=0)
+        self.app.add_handler(CommandHandler("list_admins", self.list_admins_command, filters=self._admin_filter))
+        self.app.add_handler(CommandHandler("remove_admin", self.remove_admin_command, filters=self._admin_filter))
+        self.app.add_handler(CommandHandler("unmute", self.unmute_command, filters=self._admin_filter))
+        self.app.add_handler(CommandHandler("check_mutes", self.check_mutes_command, filters=self._admin_filter))
+        self.app.add_handler(CommandHandler("debug", self.debug_command, filters=self._admin_filter))
+        self.app.add_handler(CommandHandler("test_permissions", self.test_permissions_command, filters=self._admin_filter))
+        self.app.add_handler(CommandHandler("clear_flagged", self.clear_flagged_command, filters=self._admin_filter))
+        # Admin commands from anyone else fall through to here
+        for command, denial in _ADMIN_DENIALS.items():
+            self.app.add_handler(CommandHandler(command, functools.partial(self.deny_admin_command, denial)))
+        # Keeps the member cache honest when someone, the bot included, is promoted or demoted
+        self.app.add_handler(ChatMemberHandler(self.chat_member_updated, ChatMemberHandler.ANY_CHAT_MEMBER))
+        # Message filter handler - highest priority. Only group chats with something to filter
+        # are dispatched here; everything else is rejected by the filter before any callback runs
+        self.app.add_handler(
+            MessageHandler(filters.TEXT & filters.ChatType.GROUPS & self._chat_filter, self.filter_message),
+            group=0,
+        )
 
-    async def clear_flagged_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
-        """Clear flagged messages list"""
-        if not self.is_bot_admin(update.effective_user.id):
-            await update.message.reply_text("❌ Only bot admins can clear flagged messages.")
+    async def deny_admin_command(self, denial: str, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Explain to a non-admin why an admin-only command did nothing"""
+        # Edited commands reach CommandHandlers too, and those carry no update.message
+        message = update.effective_message
+        if message is None:
             return
+        await message.reply_text(denial)
 
-        self.config["flagged_messages"] = {}
-        self.save_config()
+    async def clear_flagged_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Clear flagged messages list"""
+        self.record("clear_flagged")
         await update.message.reply_text("✅ Cleared all flagged messages from tracking.")
 
     async def test_permissions_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Test bot permissions in current chat"""
-        if not self.is_bot_admin(update.effective_user.id):
-            await update.message.reply_text("❌ Only bot admins can test permissions.")
-            return
-
         try:
-            bot_member = await context.bot.get_chat_member(update.effective_chat.id, context.bot.id)
+            bot_member = await self.get_member(update.effective_chat.id, context.bot.id)
             
             permissions_text = f"""
 🔍 <b>Bot Permissions Test:</b>
@@ -95,52 +531,13 @@ class TopicKeywordBot:
             await update.message.reply_text(f"❌ Error checking permissions: {e}")
 
     async def start_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
-        await update.message.reply_text(
-            "🤖 <b>Topic Keyword Filter Bot</b>\n\n"
-            "I can mute users for using specific keywords in designated topics!\n\n"
-            "Use /help to see available commands.",
-            parse_mode="HTML"
-        )
+        await update.message.reply_text(START_TEXT, parse_mode="HTML")
 
     async def help_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
-        help_text = """
-🤖 <b>Topic Keyword Filter Bot Commands:</b>
-
-<b>For Admins:</b>
-• /add_keyword &lt;topic_id&gt; &lt;keyword&gt; - Add a keyword to filter
-• /remove_keyword &lt;topic_id&gt; &lt;keyword&gt; - Remove a keyword
-• /list_keywords [topic_id] - List keywords (all or specific topic/chat)
-• /add_admin &lt;user_id&gt; - Add a user as bot admin
-• /forceaddadmin &lt;user_id&gt; - Forcefully add admin (restricted access)
-• /list_admins - Show all bot admins
-• /remove_admin &lt;user_id&gt; - Remove admin
-• /unmute &lt;user_id&gt; - Manually unmute a user
-• /check_mutes - Check currently muted users
-• /debug - Show debug information about current chat
-• /test_permissions - Test bot permissions
-• /clear_flagged - Clear flagged messages tracking
-
-<b>Features:</b>
-• Regular users get muted for 12 hours when using filtered keywords
-• Bot admins: no restrictions applied
-• Telegram admins: no restrictions applied
-• Automatic unmuting after 12 hours
-• Deletes original message AND all replies to it
-
-<b>Notes:</b>
-• Bot must be admin with restrict and delete permissions
-• Keywords are case-insensitive
-• For supergroups with topics: use topic ID from URL or /debug
-• For general chat in supergroups: often topic ID 1 or use /debug to confirm
-        """
-        await update.message.reply_text(help_text, parse_mode="HTML")
+        await update.message.reply_text(HELP_TEXT, parse_mode="HTML")
 
     async def debug_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Debug command to show current chat information"""
-        if not self.is_bot_admin(update.effective_user.id):
-            await update.message.reply_text("❌ Only bot admins can use debug command.")
-            return
-
         chat_id = str(update.effective_chat.id)
         message_thread_id = update.message.message_thread_id
         
@@ -152,7 +549,7 @@ class TopicKeywordBot:
         
         # Check bot permissions
         try:
-            bot_member = await context.bot.get_chat_member(update.effective_chat.id, context.bot.id)
+            bot_member = await self.get_member(update.effective_chat.id, context.bot.id)
             can_restrict = getattr(bot_member, 'can_restrict_members', False)
             can_delete = getattr(bot_member, 'can_delete_messages', False)
             bot_status = bot_member.status
@@ -160,10 +557,10 @@ class TopicKeywordBot:
             can_restrict = "Error checking"
             can_delete = "Error checking"
             bot_status = "Unknown"
-            logger.error(f"Error checking bot permissions: {e}")
+            logger.error("Error checking bot permissions: %s", e)
 
         # Count flagged messages
-        flagged_count = len(self.config.get("flagged_messages", {}))
+        flagged_count = len(self.config["flagged_messages"])
 
         debug_info = f"""
 🔍 <b>Debug Information:</b>
@@ -185,9 +582,9 @@ class TopicKeywordBot:
 <b>Keywords for this location:</b>
         """
         
-        topic_keywords = self.config["topic_keywords"].get(chat_id, {}).get(topic_id, [])
+        topic_keywords = self._resolved.get((chat_id, topic_id))
         if topic_keywords:
-            keyword_list = "\n".join([f"• {kw}" for kw in topic_keywords])
+            keyword_list = "\n".join([f"• {kw}" for kw in sorted(topic_keywords)])
             debug_info += f"\n{keyword_list}"
         else:
             debug_info += "\n• No keywords configured"
@@ -197,78 +594,176 @@ class TopicKeywordBot:
         
         await update.message.reply_text(debug_info, parse_mode="HTML")
 
+    async def get_member(self, chat_id: int, user_id: int):
+        """get_chat_member, cached for TG_ADMIN_TTL seconds; shared by admin checks, /debug and /test_permissions"""
+        key = (chat_id, user_id)
+        cached = self._member_cache.get(key)
+        if cached is not None:
+            if time.monotonic() - cached[1] < TG_ADMIN_TTL:
+                self._member_cache.move_to_end(key)
+                return cached[0]
+            del self._member_cache[key]
+
+        member = await self._api_call(self.app.bot.get_chat_member, chat_id, user_id)
+        self._member_cache[key] = (member, time.monotonic())
+        if len(self._member_cache) > MEMBER_CACHE_SIZE:
+            self._member_cache.popitem(last=False)
+        return member
+
     async def is_telegram_admin(self, user_id: int, chat_id: int) -> bool:
         """Check if user is a Telegram chat admin"""
         try:
-            chat_member = await self.app.bot.get_chat_member(chat_id, user_id)
-            return chat_member.status in ['administrator', 'creator']
+            chat_member = await self.get_member(chat_id, user_id)
         except Exception as e:
-            logger.error(f"Error checking admin status: {e}")
+            logger.error("Error checking admin status: %s", e)
             return False
+        return chat_member.status in ['administrator', 'creator']
+
+    async def chat_member_updated(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Drop the cached membership of a member (or the bot itself) whose role just changed"""
+        member_update = update.chat_member or update.my_chat_member
+        self._member_cache.pop((member_update.chat.id, member_update.new_chat_member.user.id), None)
+
+    def build_matcher(self, keywords):
+        """Compile keywords into a callable returning the first keyword found in a text, or None"""
+        # A text shorter than every keyword cannot contain any of them
+        min_len = min(map(len, keywords))
+
+        if hyperscan is not None and len(keywords) >= AUTOMATON_MIN_KEYWORDS:
+            return self.build_hyperscan_matcher(keywords, min_len)
+
+        if ahocorasick is not None and len(keywords) >= AUTOMATON_MIN_KEYWORDS:
+            automaton = ahocorasick.Automaton()
+            for kw in keywords:
+                automaton.add_word(kw, kw)
+            automaton.make_automaton()
+            return lambda text: None if len(text) < min_len else next(automaton.iter(text), (None, None))[1]
+
+        # Shortest first: cheaper needles get tested before longer ones
+        needles = tuple(sorted(keywords, key=len))
+
+        def match(text):
+            if len(text) < min_len:
+                return None
+            for kw in needles:
+                if kw in text:
+                    return kw
+            return None
+
+        return match
+
+    @staticmethod
+    def build_hyperscan_matcher(keywords, min_len):
+        """Compile keywords into a Hyperscan block-mode database and return its scan function"""
+        ordered = sorted(keywords)
+        database = hyperscan.Database(mode=hyperscan.HS_MODE_BLOCK)
+        # Keywords and texts are both casefolded already, so no caseless flag is needed
+        database.compile(
+            expressions=[re.escape(kw).encode() for kw in ordered],
+            ids=list(range(len(ordered))),
+            flags=[hyperscan.HS_FLAG_SINGLEMATCH] * len(ordered),
+        )
+
+        def match(text):
+            if len(text) < min_len:
+                return None
+            found = []
+
+            def on_match(kw_id, start, end, flags, context):
+                found.append(ordered[kw_id])
+                return True  # stop at the first hit
+
+            try:
+                database.scan(text.encode(), match_event_handler=on_match)
+            except hyperscan.ScanTerminated:
+                pass  # raised when on_match halts the scan
+            return found[0] if found else None
+
+        return match
+
+    def get_matcher(self, chat_id: str, topic_id: str, keywords):
+        """Return the cached matcher for a topic, building it on first use"""
+        key = (chat_id, topic_id, self._topic_versions.get((chat_id, topic_id), 0))
+        matcher = self._automata.get(key)
+        if matcher is not None:
+            self._automata.move_to_end(key)
+            return matcher
+
+        matcher = self._automata[key] = self.build_matcher(keywords)
+        if len(self._automata) > MATCHER_CACHE_SIZE:
+            self._automata.popitem(last=False)
+        return matcher
+
+    def bump_topic_version(self, chat_id: str, topic_id: str):
+        """Invalidate a topic's cached matcher; the stale entry ages out of the LRU"""
+        key = (chat_id, topic_id)
+        self._topic_versions[key] = self._topic_versions.get(key, 0) + 1
 
     def is_bot_admin(self, user_id: int) -> bool:
         """Check if user is a bot admin"""
-        return user_id in self.config.get("admin_users", [])
+        return user_id in self._admin_set
 
     async def add_keyword_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
-        if not self.is_bot_admin(update.effective_user.id):
-            await update.message.reply_text("❌ Only bot admins can configure keyword filters.")
-            return
-
         if len(context.args) < 2:
             await update.message.reply_text("❌ Usage: /add_keyword <topic_id> <keyword>\nUse /debug to find the correct topic ID")
             return
 
         try:
             topic_id = context.args[0]
-            keywords = [kw.lower() for kw in context.args[1:]]
+            keywords = [kw.casefold() for kw in context.args[1:]]
             chat_id = str(update.effective_chat.id)
 
-            self.config["topic_keywords"].setdefault(chat_id, {})
-            self.config["topic_keywords"][chat_id].setdefault(topic_id, [])
+            key = (chat_id, topic_id)
 
             added = []
             skipped = []
+            covered = []
+            replaced = []
 
             for kw in keywords:
-                if kw not in self.config["topic_keywords"][chat_id][topic_id]:
-                    self.config["topic_keywords"][chat_id][topic_id].append(kw)
-                    added.append(kw)
-                else:
+                existing = self._resolved.get(key, ())
+                if kw in existing:
                     skipped.append(kw)
-
-            self.save_config()
+                    continue
+                # Matching is by substring, so a keyword containing an existing one can never fire
+                covering = next((k for k in existing if k in kw), None)
+                if covering is not None:
+                    covered.append(f"{kw} (by '{covering}')")
+                    continue
+                # ...and existing keywords containing the new one become redundant
+                for dominated in [k for k in existing if kw in k]:
+                    self.record("remove_keyword", chat_id=chat_id, topic_id=topic_id, keyword=dominated)
+                    replaced.append(dominated)
+                    logger.info("Keyword '%s' superseded by '%s' in chat %s topic %s", dominated, kw, chat_id, topic_id)
+                self.record("add_keyword", chat_id=chat_id, topic_id=topic_id, keyword=kw)
+                added.append(kw)
 
             response = ""
             if added:
                 response += f"✅ Added: {', '.join(added)}\n"
+            if replaced:
+                response += f"♻️ Replaced by shorter keywords: {', '.join(replaced)}\n"
             if skipped:
-                response += f"⚠️ Already existed: {', '.join(skipped)}"
+                response += f"⚠️ Already existed: {', '.join(skipped)}\n"
+            if covered:
+                response += f"⚠️ Already covered: {', '.join(covered)}"
             await update.message.reply_text(response.strip())
 
         except Exception as e:
             await update.message.reply_text(f"❌ Error adding keyword: {e}")
 
     async def remove_keyword_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
-        if not self.is_bot_admin(update.effective_user.id):
-            await update.message.reply_text("❌ Only bot admins can configure keyword filters.")
-            return
-
         if len(context.args) < 2:
             await update.message.reply_text("❌ Usage: /remove_keyword <topic_id> <keyword>")
             return
 
         try:
             topic_id = context.args[0]
-            keyword = " ".join(context.args[1:]).lower()
+            keyword = " ".join(context.args[1:]).casefold()
             chat_id = str(update.effective_chat.id)
 
-            if (chat_id in self.config["topic_keywords"] and 
-                topic_id in self.config["topic_keywords"][chat_id] and
-                keyword in self.config["topic_keywords"][chat_id][topic_id]):
-                
-                self.config["topic_keywords"][chat_id][topic_id].remove(keyword)
-                self.save_config()
+            if keyword in self._resolved.get((chat_id, topic_id), ()):
+                self.record("remove_keyword", chat_id=chat_id, topic_id=topic_id, keyword=keyword)
                 await update.message.reply_text(f"✅ Removed keyword '{keyword}' from topic {topic_id}.")
             else:
                 await update.message.reply_text(f"❌ Keyword '{keyword}' not found in topic {topic_id}.")
@@ -276,29 +771,26 @@ class TopicKeywordBot:
             await update.message.reply_text(f"❌ Error removing keyword: {e}")
 
     async def list_keywords_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
-        if not self.is_bot_admin(update.effective_user.id):
-            await update.message.reply_text("❌ Only bot admins can view keyword lists.")
-            return
-
         chat_id = str(update.effective_chat.id)
+        topics = self.config["topic_keywords"].get(chat_id)
         
-        if not self.config["topic_keywords"].get(chat_id):
+        if not topics:
             await update.message.reply_text("❌ No keywords configured for this chat.")
             return
 
         if context.args:
             topic_id = context.args[0]
-            keywords = self.config["topic_keywords"][chat_id].get(topic_id, [])
+            keywords = topics.get(topic_id, [])
             if keywords:
-                keyword_list = "\n".join([f"• {kw}" for kw in keywords])
+                keyword_list = "\n".join([f"• {kw}" for kw in sorted(keywords)])
                 await update.message.reply_text(f"🔍 <b>Keywords for topic {topic_id}:</b>\n{keyword_list}", parse_mode="HTML")
             else:
                 await update.message.reply_text(f"❌ No keywords found for topic {topic_id}.")
         else:
             response = "🔍 <b>All Keywords:</b>\n\n"
-            for topic_id, keywords in self.config["topic_keywords"][chat_id].items():
+            for topic_id, keywords in topics.items():
                 if keywords:
-                    keyword_list = ", ".join(keywords)
+                    keyword_list = ", ".join(sorted(keywords))
                     response += f"<b>Topic {topic_id}:</b> {keyword_list}\n"
             
             if response == "🔍 <b>All Keywords:</b>\n\n":
@@ -307,19 +799,14 @@ class TopicKeywordBot:
             await update.message.reply_text(response, parse_mode="HTML")
 
     async def add_admin_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
-        if not self.is_bot_admin(update.effective_user.id):
-            await update.message.reply_text("❌ Only existing bot admins can add new admins.")
-            return
-
         if not context.args:
             await update.message.reply_text("❌ Usage: /add_admin <user_id>")
             return
 
         try:
             user_id = int(context.args[0])
-            if user_id not in self.config["admin_users"]:
-                self.config["admin_users"].append(user_id)
-                self.save_config()
+            if user_id not in self._admin_set:
+                self.record("add_admin", user_id=user_id)
                 await update.message.reply_text(f"✅ Added user {user_id} as bot admin.")
             else:
                 await update.message.reply_text(f"⚠️ User {user_id} is already a bot admin.")
@@ -337,9 +824,8 @@ class TopicKeywordBot:
 
         try:
             user_id = int(context.args[0])
-            if user_id not in self.config["admin_users"]:
-                self.config["admin_users"].append(user_id)
-                self.save_config()
+            if user_id not in self._admin_set:
+                self.record("add_admin", user_id=user_id)
                 await update.message.reply_text(f"✅ Force added user {user_id} as bot admin.")
             else:
                 await update.message.reply_text(f"⚠️ User {user_id} is already a bot admin.")
@@ -347,11 +833,7 @@ class TopicKeywordBot:
             await update.message.reply_text("❌ User ID must be a number.")
 
     async def list_admins_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
-        if not self.is_bot_admin(update.effective_user.id):
-            await update.message.reply_text("❌ Only bot admins can view admin list.")
-            return
-
-        admins = self.config.get("admin_users", [])
+        admins = self.config["admin_users"]
         if admins:
             admin_list = "\n".join([f"• {admin_id}" for admin_id in admins])
             await update.message.reply_text(f"👥 <b>Bot Admins:</b>\n{admin_list}", parse_mode="HTML")
@@ -359,19 +841,14 @@ class TopicKeywordBot:
             await update.message.reply_text("❌ No bot admins configured.")
 
     async def remove_admin_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
-        if not self.is_bot_admin(update.effective_user.id):
-            await update.message.reply_text("❌ Only bot admins can remove other admins.")
-            return
-
         if not context.args:
             await update.message.reply_text("❌ Usage: /remove_admin <user_id>")
             return
 
         try:
             user_id = int(context.args[0])
-            if user_id in self.config["admin_users"]:
-                self.config["admin_users"].remove(user_id)
-                self.save_config()
+            if user_id in self._admin_set:
+                self.record("remove_admin", user_id=user_id)
                 await update.message.reply_text(f"✅ Removed user {user_id} from bot admins.")
             else:
                 await update.message.reply_text(f"❌ User {user_id} is not a bot admin.")
@@ -379,10 +856,6 @@ class TopicKeywordBot:
             await update.message.reply_text("❌ User ID must be a number.")
 
     async def unmute_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
-        if not self.is_bot_admin(update.effective_user.id):
-            await update.message.reply_text("❌ Only bot admins can unmute users.")
-            return
-
         if not context.args:
             await update.message.reply_text("❌ Usage: /unmute <user_id>")
             return
@@ -392,26 +865,16 @@ class TopicKeywordBot:
             chat_id = str(update.effective_chat.id)
             
             # Remove from muted users config
-            mute_key = f"{chat_id}_{user_id}"
-            if mute_key in self.config.get("muted_users", {}):
-                del self.config["muted_users"][mute_key]
-                self.save_config()
+            if str(user_id) in self.config["muted_users"].get(chat_id, {}):
+                self.record("unmute", chat_id=chat_id, user_id=str(user_id))
+            self.cancel_unmute_job(update.effective_chat.id, user_id)
             
             # Restore full permissions
-            await context.bot.restrict_chat_member(
+            await self._api_call(
+                context.bot.restrict_chat_member,
                 chat_id=update.effective_chat.id,
                 user_id=user_id,
-                permissions=ChatPermissions(
-                    can_send_messages=True,
-                    can_send_media_messages=True,
-                    can_send_polls=True,
-                    can_send_other_messages=True,
-                    can_add_web_page_previews=True,
-                    can_change_info=True,
-                    can_invite_users=True,
-                    can_pin_messages=True,
-                    can_manage_topics=True
-                )
+                permissions=_UNMUTE_PERMS
             )
             
             await update.message.reply_text(f"✅ User {user_id} has been unmuted.")
@@ -420,64 +883,21 @@ class TopicKeywordBot:
             await update.message.reply_text("❌ User ID must be a number.")
         except (BadRequest, Forbidden) as e:
             await update.message.reply_text(f"❌ Failed to unmute user: {e}")
-            logger.error(f"Failed to unmute user {user_id}: {e}")
+            logger.error("Failed to unmute user %s: %s", user_id, e)
 
     async def check_mutes_command(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
-        if not self.is_bot_admin(update.effective_user.id):
-            await update.message.reply_text("❌ Only bot admins can check muted users.")
-            return
-
         chat_id = str(update.effective_chat.id)
-        current_time = datetime.now()
-        
-        # Clean up expired mutes
-        expired_mutes = []
-        for mute_key, unmute_time_str in self.config.get("muted_users", {}).items():
-            if mute_key.startswith(f"{chat_id}_"):
-                unmute_time = datetime.fromisoformat(unmute_time_str)
-                if current_time >= unmute_time:
-                    expired_mutes.append(mute_key)
-        
-        # Remove expired mutes and auto-unmute
-        for mute_key in expired_mutes:
-            user_id = int(mute_key.split("_")[1])
-            try:
-                await context.bot.restrict_chat_member(
-                    chat_id=update.effective_chat.id,
-                    user_id=user_id,
-                    permissions=ChatPermissions(
-                        can_send_messages=True,
-                        can_send_media_messages=True,
-                        can_send_polls=True,
-                        can_send_other_messages=True,
-                        can_add_web_page_previews=True,
-                        can_change_info=True,
-                        can_invite_users=True,
-                        can_pin_messages=True,
-                        can_manage_topics=True
-                    )
-                )
-                logger.info(f"Auto-unmuted expired mute for user {user_id}")
-            except Exception as e:
-                logger.error(f"Failed to auto-unmute user {user_id}: {e}")
-            
-            del self.config["muted_users"][mute_key]
+        current_time = time.time()
         
-        if expired_mutes:
-            self.save_config()
-        
-        # Show current mutes
+        # Expired mutes are cleared by their scheduled unmute job, so this is display only
         active_mutes = []
-        for mute_key, unmute_time_str in self.config.get("muted_users", {}).items():
-            if mute_key.startswith(f"{chat_id}_"):
-                user_id = mute_key.split("_")[1]
-                unmute_time = datetime.fromisoformat(unmute_time_str)
-                time_left = unmute_time - current_time
-                
-                if time_left.total_seconds() > 0:
-                    hours = int(time_left.total_seconds() // 3600)
-                    minutes = int((time_left.total_seconds() % 3600) // 60)
-                    active_mutes.append(f"• User {user_id}: {hours}h {minutes}m remaining")
+        for user_key, unmute_ts in self.config["muted_users"].get(chat_id, {}).items():
+            time_left = unmute_ts - current_time
+            
+            if time_left > 0:
+                hours, remainder = divmod(int(time_left), 3600)
+                minutes = remainder // 60
+                active_mutes.append(f"• User {user_key}: {hours}h {minutes}m remaining")
         
         if active_mutes:
             mute_list = "\n".join(active_mutes)
@@ -485,85 +905,157 @@ class TopicKeywordBot:
         else:
             await update.message.reply_text("✅ No users are currently muted.")
 
-    async def mute_user(self, chat_id: int, user_id: int, keyword: str, context: ContextTypes.DEFAULT_TYPE):
-        """Mute a user for 12 hours"""
+    def schedule_unmute(self, chat_id: int, user_id: int, when: float):
+        """(Re)schedule the job that lifts a mute `when` seconds from now"""
+        self.cancel_unmute_job(chat_id, user_id)
+        self.app.job_queue.run_once(
+            self._expire_mute, when=when, data=(chat_id, user_id), name=f"mute:{chat_id}:{user_id}",
+            # Overdue mutes are scheduled from post_init, before the JobQueue starts; without this
+            # APScheduler drops them as missed if startup takes more than a second
+            job_kwargs={"misfire_grace_time": None},
+        )
+
+    def cancel_unmute_job(self, chat_id: int, user_id: int):
+        for job in self.app.job_queue.get_jobs_by_name(f"mute:{chat_id}:{user_id}"):
+            job.schedule_removal()
+
+    def schedule_pending_unmutes(self):
+        """Recreate unmute jobs for mutes persisted before a restart; overdue ones run right away"""
+        now = time.time()
+        for chat_id, chat_mutes in self.config["muted_users"].items():
+            for user_id, unmute_ts in chat_mutes.items():
+                self.schedule_unmute(int(chat_id), int(user_id), max(0, unmute_ts - now))
+
+    async def _expire_mute(self, context: ContextTypes.DEFAULT_TYPE):
+        """Job callback: restore a user's permissions and forget the mute once it has expired"""
+        chat_id, user_id = context.job.data
         try:
-            # Calculate unmute time (12 hours)
-            unmute_time = datetime.now() + timedelta(hours=12)
-            
-            # Mute the user with restricted permissions
-            await context.bot.restrict_chat_member(
+            await self._api_call(
+                context.bot.restrict_chat_member,
                 chat_id=chat_id,
                 user_id=user_id,
-                permissions=ChatPermissions(
-                    can_send_messages=False,
-                    can_send_media_messages=False,
-                    can_send_polls=False,
-                    can_send_other_messages=False,
-                    can_add_web_page_previews=False,
-                    can_change_info=False,
-                    can_invite_users=False,
-                    can_pin_messages=False,
-                    can_manage_topics=False
-                ),
-                until_date=unmute_time
+                permissions=_UNMUTE_PERMS
             )
-            
-            # Store mute info
-            mute_key = f"{chat_id}_{user_id}"
-            self.config.setdefault("muted_users", {})[mute_key] = unmute_time.isoformat()
-            self.save_config()
-            
-            # Send notification with user mention
-            await context.bot.send_message(
+            logger.info("Auto-unmuted expired mute for user %s", user_id)
+        except Exception as e:
+            logger.error("Failed to auto-unmute user %s: %s", user_id, e)
+
+        if str(user_id) in self.config["muted_users"].get(str(chat_id), {}):
+            self.record("unmute", chat_id=str(chat_id), user_id=str(user_id))
+
+    async def mute_user(self, chat_id: int, user_id: int, keyword: str, context: ContextTypes.DEFAULT_TYPE):
+        """Mute a user for 12 hours"""
+        # The notice depends on whether the restriction went through, so these two stay in
+        # order; the message deletion already runs alongside them (see filter_message)
+        muted = await self._restrict_and_record(chat_id, user_id, context)
+        await self._notify_mute(chat_id, user_id, muted, context)
+        if muted:
+            logger.info("Successfully muted user %s for keyword '%s' for %ss", user_id, keyword, MUTE_SECONDS)
+
+    async def _restrict_and_record(self, chat_id: int, user_id: int, context: ContextTypes.DEFAULT_TYPE) -> bool:
+        """Restrict the user and persist the mute; False if Telegram refused"""
+        # Calculate unmute time (12 hours)
+        unmute_ts = time.time() + MUTE_SECONDS
+        try:
+            await self._api_call(
+                context.bot.restrict_chat_member,
                 chat_id=chat_id,
-                text=f"🔇 User <a href='tg://user?id={user_id}'>{user_id}</a> was muted for 12 hours for using a restricted keyword in this topic.",
-                parse_mode="HTML"
+                user_id=user_id,
+                permissions=_MUTE_PERMS,
+                # Aware datetime: PTB would read a naive one as UTC, not local time
+                until_date=datetime.fromtimestamp(unmute_ts, tz=timezone.utc)
             )
-            
-            logger.info(f"Successfully muted user {user_id} for keyword '{keyword}' until {unmute_time}")
-            
         except (BadRequest, Forbidden) as e:
-            logger.error(f"Failed to mute user {user_id}: {e}")
-            # Try to send a notification about the failed mute
-            try:
-                await context.bot.send_message(
-                    chat_id=chat_id,
-                    text=f"⚠️ Could not mute user <a href='tg://user?id={user_id}'>{user_id}</a> due to insufficient permissions. Please ensure bot has 'Restrict Members' permission.",
-                    parse_mode="HTML"
-                )
-            except:
-                pass
+            logger.error("Failed to mute user %s: %s", user_id, e)
+            return False
 
-    async def delete_message_and_replies(self, chat_id: int, message_id: int, context: ContextTypes.DEFAULT_TYPE):
-        """Delete a message and track it for reply deletion"""
+        # Store mute info
+        self.record("mute", chat_id=str(chat_id), user_id=str(user_id), until=unmute_ts)
+        self.schedule_unmute(chat_id, user_id, MUTE_SECONDS)
+        return True
+
+    async def _notify_mute(self, chat_id: int, user_id: int, muted: bool, context: ContextTypes.DEFAULT_TYPE):
+        """Tell the chat whether the mute was applied; failures here are only logged"""
+        if muted:
+            text = f"🔇 User <a href='tg://user?id={user_id}'>{user_id}</a> was muted for 12 hours for using a restricted keyword in this topic."
+        else:
+            text = f"⚠️ Could not mute user <a href='tg://user?id={user_id}'>{user_id}</a> due to insufficient permissions. Please ensure bot has 'Restrict Members' permission."
         try:
-            # Delete the original message
-            await context.bot.delete_message(chat_id=chat_id, message_id=message_id)
-            
-            # Store this message ID as flagged for reply tracking
-            flagged_key = f"{chat_id}_{message_id}"
-            self.config.setdefault("flagged_messages", {})[flagged_key] = {
-                "timestamp": datetime.now().isoformat(),
-                "chat_id": chat_id,
-                "message_id": message_id
-            }
-            self.save_config()
-            
-            logger.info(f"Deleted message {message_id} in chat {chat_id} and flagged for reply tracking")
-            
+            await self._api_call(context.bot.send_message, chat_id=chat_id, text=text, parse_mode="HTML")
+        except Exception as e:
+            logger.warning("Could not send mute notice for user %s: %s", user_id, e)
+
+    async def _api_call(self, method, *args, **kwargs):
+        """Call a Bot API method with bounded concurrency, waiting out flood limits"""
+        async with self._api_sem:
+            while True:
+                try:
+                    return await method(*args, **kwargs)
+                except RetryAfter as e:
+                    logger.warning("Flood limit hit on %s, retrying in %ss", method.__name__, e.retry_after)
+                    await asyncio.sleep(e.retry_after)
+
+    def spawn(self, coro):
+        """Run a coroutine in the background without blocking the current handler"""
+        task = asyncio.create_task(coro)
+        self._background_tasks.add(task)
+        task.add_done_callback(self._background_tasks.discard)
+        return task
+
+    async def safe_delete(self, chat_id, message_id: int, context: ContextTypes.DEFAULT_TYPE):
+        """Delete a message, logging instead of raising on failure"""
+        try:
+            await self._api_call(context.bot.delete_message, chat_id=chat_id, message_id=message_id)
+            logger.info("Deleted message %s in chat %s", message_id, chat_id)
         except Exception as e:
-            logger.warning(f"Could not delete message {message_id}: {e}")
+            logger.warning("Could not delete message %s: %s", message_id, e)
+
+    def index_reply(self, chat_id: str, parent_id: int, reply_id: int):
+        """Remember a reply so it can be deleted together with its parent"""
+        key = (chat_id, parent_id)
+        replies = self._reply_index.get(key)
+        if replies is None:
+            self._reply_index[key] = [reply_id]
+            if len(self._reply_index) > REPLY_INDEX_SIZE:
+                self._reply_index.popitem(last=False)
+        else:
+            replies.append(reply_id)
+
+    async def delete_message_and_replies(self, chat_id: int, message_id: int, context: ContextTypes.DEFAULT_TYPE):
+        """Delete a message and the replies already sent to it, and track it for later replies"""
+        key = (_sid(chat_id), message_id)
+        # The message and its known replies are independent deletes: overlap the round-trips
+        replies = self._reply_index.pop(key, ())
+        result = (await asyncio.gather(
+            self._api_call(context.bot.delete_message, chat_id=chat_id, message_id=message_id),
+            *(self.safe_delete(chat_id, reply_id, context) for reply_id in replies),
+            return_exceptions=True,
+        ))[0]
+        if isinstance(result, Exception):
+            logger.warning("Could not delete message %s: %s", message_id, result)
+            return
+
+        # Store this message ID as flagged for reply tracking
+        self.record("flag", flagged_key=f"{chat_id}_{message_id}", message={
+            "timestamp": datetime.now().isoformat(),
+            "chat_id": chat_id,
+            "message_id": message_id
+        })
+        logger.info("Deleted message %s in chat %s and flagged for reply tracking", message_id, chat_id)
+
+        # Replies that arrived while the delete was in flight were indexed instead of blocked
+        replies = self._reply_index.pop(key, ())
+        if replies:
+            await asyncio.gather(*(self.safe_delete(chat_id, reply_id, context) for reply_id in replies))
 
     async def filter_message(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         if not update.message or not update.message.text:
             return
 
-        chat_id = str(update.effective_chat.id)
+        chat_id = _sid(update.effective_chat.id)
         message_thread_id = update.message.message_thread_id
         user_id = update.effective_user.id
         message_id = update.message.message_id
-        message_text = update.message.text.lower()
 
         # ============================
         # Block replies to flagged messages
@@ -572,66 +1064,81 @@ class TopicKeywordBot:
             replied_message_id = update.message.reply_to_message.message_id
             flagged_key = f"{chat_id}_{replied_message_id}"
 
-            if flagged_key in self.config.get("flagged_messages", {}):
-                try:
-                    await context.bot.delete_message(chat_id=chat_id, message_id=replied_message_id)
-                    logger.info(f"Deleted flagged message {replied_message_id} before its reply")
-
-                    await context.bot.delete_message(chat_id=chat_id, message_id=message_id)
-                    logger.info(f"Deleted reply {message_id} to flagged message from user {user_id}")
-                except Exception as e:
-                    logger.warning(f"Failed to delete flagged or reply message: {e}")
+            if flagged_key in self.config["flagged_messages"]:
+                # Independent deletes: the flagged message is usually gone already, which
+                # must not stop the reply from being removed
+                self.spawn(self.safe_delete(chat_id, replied_message_id, context))
+                self.spawn(self.safe_delete(chat_id, message_id, context))
+                logger.info("Deleting reply %s to flagged message from user %s", message_id, user_id)
                 return
 
+            # Inside a forum topic every message "replies" to the topic's root; those aren't real
+            # replies. Outside topics message_thread_id is the reply chain's root, which can well be
+            # the message being replied to, so only skip the topic case
+            if not (update.message.is_topic_message and replied_message_id == message_thread_id):
+                self.index_reply(chat_id, replied_message_id, message_id)
+
+        # Bot admins are exempt from keyword filtering: skip the scan entirely with a set lookup
+        if self.is_bot_admin(user_id):
+            return
+
         # ============================
         # Determine topic/thread ID
         # ============================
         if update.effective_chat.type == 'supergroup':
-            topic_id = str(message_thread_id) if message_thread_id else "1"
+            topic_id = _sid(message_thread_id) if message_thread_id else "1"
         else:
-            topic_id = "0" if message_thread_id is None else str(message_thread_id)
-
-        logger.debug(f"Processing message in chat {chat_id} (type: {update.effective_chat.type}), topic {topic_id}, from user {user_id}")
+            topic_id = "0" if message_thread_id is None else _sid(message_thread_id)
 
         # ============================
         # Get keywords for this topic
         # ============================
-        topic_keywords = self.config["topic_keywords"].get(chat_id, {}).get(topic_id, [])
+        # Most messages come from topics without keywords - bail out before any other work
+        topic_keywords = self._resolved.get((chat_id, topic_id))
         if not topic_keywords:
             return
 
+        logger.debug("Processing message in chat %s (type: %s), topic %s, from user %s", chat_id, update.effective_chat.type, topic_id, user_id)
+
         # ============================
-        # Check message for filtered keywords
+        # Check message for filtered keywords (single pass over the text)
         # ============================
-        for keyword in topic_keywords:
-            if keyword in message_text:
-                logger.info(f"Keyword '{keyword}' found in message from user {user_id}")
-
-                is_bot_admin = self.is_bot_admin(user_id)
-                is_tg_admin = await self.is_telegram_admin(user_id, update.effective_chat.id)
-
-                if is_bot_admin or is_tg_admin:
-                    logger.info(f"Admin {user_id} used prohibited keyword '{keyword}' - no action taken")
-                    return
-
-                await self.mute_user(update.effective_chat.id, user_id, keyword, context)
-                logger.info(f"User {user_id} muted for keyword '{keyword}'")
-
-                await self.delete_message_and_replies(update.effective_chat.id, message_id, context)
+        # Keywords are stored casefolded, so only the message needs folding - and only
+        # once we know this topic has something to match against. casefold() rather than
+        # lower() so e.g. "STRASSE" and "straße" compare equal
+        message_text = update.message.text.casefold()
+        keyword = self.get_matcher(chat_id, topic_id, topic_keywords)(message_text)
+        if keyword is not None:
+            logger.info("Keyword '%s' found in message from user %s", keyword, user_id)
+
+            # Chat admins need a (cached) API lookup, so only ask once there is a hit
+            if await self.is_telegram_admin(user_id, update.effective_chat.id):
+                logger.info("Admin %s used prohibited keyword '%s' - no action taken", user_id, keyword)
                 return
 
+            # Independent API calls: run the delete and the mute side by side, each handling
+            # its own errors, so the reaction takes the slower of the two rather than the sum
+            # (mute_user logs the mute itself, and only when it went through)
+            results = await asyncio.gather(
+                self.delete_message_and_replies(update.effective_chat.id, message_id, context),
+                self.mute_user(update.effective_chat.id, user_id, keyword, context),
+                return_exceptions=True,
+            )
+            for result in results:
+                if isinstance(result, Exception):
+                    logger.error("Error handling keyword hit from user %s: %s", user_id, result)
 
     async def test_token(self):
         """Test if the bot token is valid"""
         try:
             bot_info = await self.app.bot.get_me()
-            logger.info(f"Bot token is valid. Bot name: {bot_info.first_name}")
+            logger.info("Bot token is valid. Bot name: %s", bot_info.first_name)
             return True
         except InvalidToken:
             logger.error("Invalid bot token!")
             return False
         except Exception as e:
-            logger.error(f"Error testing token: {e}")
+            logger.error("Error testing token: %s", e)
             return False
 
     def run(self):
@@ -643,16 +1150,35 @@ class TopicKeywordBot:
             
             # Clear any pending updates and conflicts
             print("🔄 Clearing pending updates...")
-            self.app.run_polling(
-                drop_pending_updates=True,
-                close_loop=False,
-                stop_signals=None
-            )
+            # chat_member updates are opt-in; list them alongside messages
+            allowed_updates = [Update.MESSAGE, Update.CHAT_MEMBER, Update.MY_CHAT_MEMBER]
+            webhook_url = os.getenv("WEBHOOK_URL")
+            if webhook_url:
+                # Telegram pushes updates to us instead of us long-polling for them
+                print("🌐 Listening for webhook updates...")
+                self.app.run_webhook(
+                    listen="0.0.0.0",
+                    port=int(os.getenv("PORT", "8443")),
+                    url_path=self.token,
+                    webhook_url=f"{webhook_url.rstrip('/')}/{self.token}",
+                    secret_token=os.getenv("WEBHOOK_SECRET"),
+                    drop_pending_updates=True,
+                    allowed_updates=allowed_updates,
+                    close_loop=False,
+                    stop_signals=None
+                )
+            else:
+                self.app.run_polling(
+                    drop_pending_updates=True,
+                    allowed_updates=allowed_updates,
+                    close_loop=False,
+                    stop_signals=None
+                )
             
         except InvalidToken:
             print("❌ Invalid bot token! Please check your token.")
         except Exception as e:
-            logger.error(f"Error running bot: {e}")
+            logger.error("Error running bot: %s", e)
             print(f"❌ Error running bot: {e}")
 
 def main():
@@ -666,6 +1192,13 @@ def main():
         print("❌ No bot token provided! Exiting...")
         return
     
+    # libuv-backed event loop when available; the stdlib loop works the same, only slower
+    try:
+        import uvloop
+        uvloop.install()
+    except ImportError:
+        pass
+
     try:
         bot = TopicKeywordBot(token)
         bot.run()
@@ -673,7 +1206,7 @@ def main():
         print("\n🛑 Bot stopped by user")
     except Exception as e:
         print(f"❌ Unexpected error: {e}")
-        logger.error(f"Unexpected error in main: {e}")
+        logger.error("Unexpected error in main: %s", e)
 
 if __name__ == "__main__":
     main()
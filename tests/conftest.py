@@ -0,0 +1,74 @@
+import os
+import sys
+import types
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import keywordbot  # noqa: E402
+
+
+class FakeBot:
+    """Stands in for context.bot: records every API call and returns minimal results"""
+
+    def __init__(self):
+        self.calls = []
+        self.id = 999
+
+    def __getattr__(self, name):
+        async def call(*args, **kwargs):
+            self.calls.append((name, args, kwargs))
+            if name == "get_chat_member":
+                return types.SimpleNamespace(status="member")
+            return types.SimpleNamespace(message_id=1)
+
+        call.__name__ = name
+        return call
+
+    def deleted(self):
+        return [kwargs["message_id"] for name, _, kwargs in self.calls if name == "delete_message"]
+
+
+async def _reply_text(*args, **kwargs):
+    pass
+
+
+@pytest.fixture
+def bot(tmp_path, monkeypatch):
+    """A bot whose config and journal live in a fresh temporary directory"""
+    monkeypatch.chdir(tmp_path)
+    return keywordbot.TopicKeywordBot("123:ABC")
+
+
+@pytest.fixture
+def fake_bot():
+    return FakeBot()
+
+
+@pytest.fixture
+def context(fake_bot):
+    return types.SimpleNamespace(bot=fake_bot, args=[])
+
+
+@pytest.fixture
+def make_update():
+    def make(text, chat_id=-100, user_id=5, message_id=10, thread_id=None, reply_to=None,
+             is_topic_message=False, chat_type="supergroup"):
+        message = types.SimpleNamespace(
+            text=text,
+            chat_id=chat_id,
+            message_id=message_id,
+            message_thread_id=thread_id,
+            is_topic_message=is_topic_message,
+            reply_to_message=types.SimpleNamespace(message_id=reply_to) if reply_to else None,
+            reply_text=_reply_text,
+        )
+        return types.SimpleNamespace(
+            message=message,
+            effective_message=message,
+            effective_chat=types.SimpleNamespace(id=chat_id, type=chat_type),
+            effective_user=types.SimpleNamespace(id=user_id),
+        )
+
+    return make
@@ -0,0 +1,67 @@
+import asyncio
+import datetime
+import types
+
+import pytest
+from telegram import Chat, Message, MessageEntity, Update, User
+
+import keywordbot
+
+
+@pytest.fixture
+def command_update(bot):
+    bot.app.bot._bot_user = User(999, "bot", True, username="kwbot")
+
+    def make(user_id, text, edited=False):
+        command = text.split()[0]
+        message = Message(
+            1, datetime.datetime.now(), Chat(-100, "supergroup"),
+            from_user=User(user_id, "user", False), text=text,
+            entities=[MessageEntity(MessageEntity.BOT_COMMAND, 0, len(command))],
+        )
+        message.set_bot(bot.app.bot)
+        return Update(1, edited_message=message) if edited else Update(1, message=message)
+
+    return make
+
+
+def dispatched_handler(bot, update):
+    for handler in bot.app.handlers[0]:
+        if handler.check_update(update) not in (None, False):
+            return handler
+
+
+def test_admin_commands_reach_their_handler_only_for_admins(bot, command_update):
+    bot.record("add_admin", user_id=7)
+    handler = dispatched_handler(bot, command_update(7, "/add_keyword 1 spam"))
+    assert handler.callback == bot.add_keyword_command
+
+    denied = dispatched_handler(bot, command_update(5, "/add_keyword 1 spam"))
+    assert denied.callback.args == (keywordbot._ADMIN_DENIALS["add_keyword"],)
+
+    bot.record("remove_admin", user_id=7)
+    demoted = dispatched_handler(bot, command_update(7, "/add_keyword 1 spam"))
+    assert demoted.callback.args == (keywordbot._ADMIN_DENIALS["add_keyword"],)
+
+
+def test_public_commands_are_not_gated(bot, command_update):
+    assert dispatched_handler(bot, command_update(5, "/start")).callback == bot.start_command
+
+
+def test_denial_replies_with_the_command_message(bot):
+    replies = []
+
+    async def reply_text(text):
+        replies.append(text)
+
+    update = types.SimpleNamespace(effective_message=types.SimpleNamespace(reply_text=reply_text))
+    asyncio.run(bot.deny_admin_command("❌ nope", update, None))
+    assert replies == ["❌ nope"]
+
+
+def test_denial_ignores_updates_without_a_message(bot, command_update):
+    update = command_update(5, "/unmute 3", edited=True)
+    handler = dispatched_handler(bot, update)
+    assert handler.callback.args == (keywordbot._ADMIN_DENIALS["unmute"],)
+    # Edited commands are dispatched too; they must not raise on the missing update.message
+    asyncio.run(handler.callback(types.SimpleNamespace(effective_message=None), None))
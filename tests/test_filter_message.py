@@ -0,0 +1,41 @@
+import asyncio
+import logging
+
+from telegram.error import BadRequest
+
+
+def test_keyword_hit_deletes_and_mutes(bot, context, fake_bot, make_update):
+    bot.record("add_keyword", chat_id="-100", topic_id="1", keyword="spam")
+
+    asyncio.run(bot.filter_message(make_update("buy SPAM now", message_id=10), context))
+
+    names = [name for name, _, _ in fake_bot.calls]
+    assert fake_bot.deleted() == [10]
+    assert "restrict_chat_member" in names
+    assert "5" in bot.config["muted_users"]["-100"]
+
+
+def test_failed_mute_is_not_logged_as_a_mute(bot, context, fake_bot, make_update, caplog):
+    bot.record("add_keyword", chat_id="-100", topic_id="1", keyword="spam")
+
+    async def refuse(*args, **kwargs):
+        raise BadRequest("Not enough rights to restrict/unrestrict chat member")
+
+    fake_bot.restrict_chat_member = refuse
+    with caplog.at_level(logging.INFO, logger="keywordbot"):
+        asyncio.run(bot.filter_message(make_update("spam", message_id=10), context))
+
+    assert bot.config["muted_users"] == {}
+    assert not any("muted" in record.getMessage() and record.levelno == logging.INFO
+                   for record in caplog.records)
+    notice = [kwargs["text"] for name, _, kwargs in fake_bot.calls if name == "send_message"]
+    assert notice and notice[0].startswith("⚠️ Could not mute")
+
+
+def test_bot_admins_are_not_scanned(bot, context, fake_bot, make_update):
+    bot.record("add_keyword", chat_id="-100", topic_id="1", keyword="spam")
+    bot.record("add_admin", user_id=5)
+
+    asyncio.run(bot.filter_message(make_update("spam", user_id=5), context))
+
+    assert fake_bot.calls == []
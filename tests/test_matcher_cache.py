@@ -0,0 +1,35 @@
+import keywordbot
+
+
+def test_matcher_is_cached_per_topic(bot):
+    bot.record("add_keyword", chat_id="-100", topic_id="1", keyword="spam")
+    keywords = bot._resolved[("-100", "1")]
+    assert bot.get_matcher("-100", "1", keywords) is bot.get_matcher("-100", "1", keywords)
+
+
+def test_keyword_changes_invalidate_the_matcher(bot):
+    bot.record("add_keyword", chat_id="-100", topic_id="1", keyword="spam")
+    keywords = bot._resolved[("-100", "1")]
+    assert bot.get_matcher("-100", "1", keywords)("eggs") is None
+
+    bot.record("add_keyword", chat_id="-100", topic_id="1", keyword="eggs")
+    assert bot.get_matcher("-100", "1", keywords)("eggs") == "eggs"
+
+    bot.record("remove_keyword", chat_id="-100", topic_id="1", keyword="spam")
+    assert bot.get_matcher("-100", "1", keywords)("spam") is None
+
+
+def test_other_topics_keep_their_matcher(bot):
+    bot.record("add_keyword", chat_id="-100", topic_id="1", keyword="spam")
+    bot.record("add_keyword", chat_id="-100", topic_id="2", keyword="ham")
+    ham = bot.get_matcher("-100", "2", bot._resolved[("-100", "2")])
+    bot.record("add_keyword", chat_id="-100", topic_id="1", keyword="eggs")
+    assert bot.get_matcher("-100", "2", bot._resolved[("-100", "2")]) is ham
+
+
+def test_matcher_cache_is_bounded(bot, monkeypatch):
+    monkeypatch.setattr(keywordbot, "MATCHER_CACHE_SIZE", 2)
+    for topic_id in ("1", "2", "3"):
+        bot.record("add_keyword", chat_id="-100", topic_id=topic_id, keyword="spam")
+        bot.get_matcher("-100", topic_id, bot._resolved[("-100", topic_id)])
+    assert [key[:2] for key in bot._automata] == [("-100", "2"), ("-100", "3")]
@@ -0,0 +1,80 @@
+import pytest
+
+import keywordbot
+
+# Regex metacharacters must be matched literally by every backend
+SPECIAL = ["a.b", "c++", "(x)", "[y]", "$5", "^z", "p|q", r"\d", "why?!", "two words", "straße".casefold()]
+# Enough plain keywords to push the automaton backends past AUTOMATON_MIN_KEYWORDS
+KEYWORDS = set(SPECIAL) | {f"kw{i:03}" for i in range(keywordbot.AUTOMATON_MIN_KEYWORDS)}
+
+SINGLE_HITS = [(f"prefix {kw} suffix", kw) for kw in sorted(KEYWORDS)]
+MISSES = ["", "ab", "axb", "c+", "x", "y", "5", "z", "pq", "d", "why", "twowords", "kw", "kw0", "nothing to see"]
+
+
+def loop_matcher(bot, monkeypatch):
+    monkeypatch.setattr(keywordbot, "hyperscan", None)
+    monkeypatch.setattr(keywordbot, "ahocorasick", None)
+    return bot.build_matcher(KEYWORDS)
+
+
+def ahocorasick_matcher(bot, monkeypatch):
+    if keywordbot.ahocorasick is None:
+        pytest.skip("pyahocorasick is not installed")
+    monkeypatch.setattr(keywordbot, "hyperscan", None)
+    return bot.build_matcher(KEYWORDS)
+
+
+def hyperscan_matcher(bot, monkeypatch):
+    if keywordbot.hyperscan is None:
+        pytest.skip("hyperscan is not installed")
+    return bot.build_matcher(KEYWORDS)
+
+
+BUILDERS = {"loop": loop_matcher, "ahocorasick": ahocorasick_matcher, "hyperscan": hyperscan_matcher}
+
+
+@pytest.fixture(scope="module")
+def module_bot(tmp_path_factory):
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        monkeypatch.chdir(tmp_path_factory.mktemp("matchers"))
+        yield keywordbot.TopicKeywordBot("123:ABC")
+
+
+@pytest.fixture(scope="module", params=list(BUILDERS))
+def matcher(request, module_bot):
+    # Built once per backend; the backend switch only matters while the matcher is compiled
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        return BUILDERS[request.param](module_bot, monkeypatch)
+
+
+@pytest.mark.parametrize("text,keyword", SINGLE_HITS)
+def test_reports_the_keyword_found(matcher, text, keyword):
+    assert matcher(text) == keyword
+
+
+@pytest.mark.parametrize("text", MISSES)
+def test_no_false_positives(matcher, text):
+    assert matcher(text) is None
+
+
+def test_several_keywords_report_one_of_them(matcher):
+    assert matcher("kw001 and a.b and c++") in {"kw001", "a.b", "c++"}
+
+
+def test_backends_agree(module_bot):
+    texts = [text for text, _ in SINGLE_HITS] + MISSES
+    results = {}
+    for name, build in BUILDERS.items():
+        with pytest.MonkeyPatch.context() as monkeypatch:
+            try:
+                match = build(module_bot, monkeypatch)
+            except pytest.skip.Exception:
+                continue
+        results[name] = [match(text) for text in texts]
+    assert all(found == results["loop"] for found in results.values())
+
+
+def test_small_topics_use_the_substring_loop(module_bot):
+    match = module_bot.build_matcher({"spam", "eggs"})
+    assert match("green eggs") == "eggs"
+    assert match("egg") is None
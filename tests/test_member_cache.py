@@ -0,0 +1,60 @@
+import asyncio
+import types
+
+import pytest
+from telegram import Bot
+
+
+@pytest.fixture
+def lookups(monkeypatch):
+    calls = []
+
+    async def get_chat_member(self, chat_id, user_id, *args, **kwargs):
+        calls.append((chat_id, user_id))
+        return types.SimpleNamespace(status="administrator" if user_id == 1 else "member")
+
+    monkeypatch.setattr(Bot, "get_chat_member", get_chat_member)
+    return calls
+
+
+def test_repeated_lookups_hit_the_cache(bot, lookups):
+    async def main():
+        return [await bot.is_telegram_admin(1, -100), await bot.is_telegram_admin(1, -100)]
+
+    assert asyncio.run(main()) == [True, True]
+    assert lookups == [(-100, 1)]
+
+
+def test_member_cache_is_bounded(bot, lookups, monkeypatch):
+    monkeypatch.setattr("keywordbot.MEMBER_CACHE_SIZE", 2)
+
+    async def main():
+        for user_id in (1, 2, 3):
+            await bot.get_member(-100, user_id)
+        # A hit refreshes recency, so user 2 is now the oldest entry
+        await bot.get_member(-100, 1)
+        await bot.get_member(-100, 4)
+
+    asyncio.run(main())
+    assert list(bot._member_cache) == [(-100, 1), (-100, 4)]
+
+
+def test_expired_entry_is_evicted_on_read(bot, lookups, monkeypatch):
+    asyncio.run(bot.get_member(-100, 2))
+    monkeypatch.setattr("keywordbot.TG_ADMIN_TTL", 0)
+    asyncio.run(bot.get_member(-100, 2))
+    assert lookups == [(-100, 2), (-100, 2)]
+    assert len(bot._member_cache) == 1
+
+
+def test_chat_member_update_invalidates(bot, lookups):
+    asyncio.run(bot.get_member(-100, 2))
+    update = types.SimpleNamespace(
+        chat_member=types.SimpleNamespace(
+            chat=types.SimpleNamespace(id=-100),
+            new_chat_member=types.SimpleNamespace(user=types.SimpleNamespace(id=2)),
+        ),
+        my_chat_member=None,
+    )
+    asyncio.run(bot.chat_member_updated(update, None))
+    assert (-100, 2) not in bot._member_cache
@@ -0,0 +1,105 @@
+import asyncio
+import types
+from datetime import datetime
+
+import orjson
+from telegram import Bot
+
+import keywordbot
+
+
+def write_legacy_files(tmp_path):
+    until = datetime(2030, 1, 1, 12, 0)
+    (tmp_path / "bot_config.json").write_bytes(orjson.dumps({
+        "topic_keywords": {},
+        "admin_users": [],
+        "muted_users": {"-1001234_567": until.isoformat(), "-42_8": until.isoformat()},
+        "flagged_messages": {},
+    }))
+    (tmp_path / "bot_config.log").write_bytes(
+        orjson.dumps({"op": "mute", "mute_key": "-1001234_9", "until": until.isoformat()}) + b"\n"
+        + orjson.dumps({"op": "unmute", "mute_key": "-42_8"}) + b"\n"
+    )
+    return until.timestamp()
+
+
+def test_legacy_snapshot_and_journal_are_migrated(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    until = write_legacy_files(tmp_path)
+
+    bot = keywordbot.TopicKeywordBot("123:ABC")
+
+    assert bot.config["muted_users"] == {"-1001234": {"567": until, "9": until}}
+    # The migrated layout is written back so the conversion only happens once
+    on_disk = orjson.loads((tmp_path / "bot_config.json").read_bytes())
+    assert on_disk["muted_users"] == {"-1001234": {"567": until}, "-42": {"8": until}}
+
+
+def test_migrate_muted_users_is_a_noop_on_the_new_layout(bot):
+    bot.config["muted_users"] = {"-100": {"5": 1.0}}
+    assert bot.migrate_muted_users() is False
+    assert bot.config["muted_users"] == {"-100": {"5": 1.0}}
+
+
+def test_unmute_drops_empty_chats(bot):
+    bot.record("mute", chat_id="-100", user_id="5", until=1.0)
+    bot.record("unmute", chat_id="-100", user_id="5")
+    assert bot.config["muted_users"] == {}
+
+
+def test_mute_schedules_a_single_unmute_job(bot, context):
+    async def main():
+        await bot.mute_user(-100, 5, "spam", context)
+        await bot.mute_user(-100, 5, "spam", context)
+
+    asyncio.run(main())
+    jobs = [job for job in bot.app.job_queue.jobs() if not job.removed]
+    assert [job.name for job in jobs] == ["mute:-100:5"]
+
+
+def test_pending_mutes_are_rescheduled(bot):
+    bot.record("mute", chat_id="-100", user_id="5", until=0.0)
+    bot.record("mute", chat_id="-200", user_id="6", until=4102444800.0)
+    bot.schedule_pending_unmutes()
+    assert sorted(job.name for job in bot.app.job_queue.jobs()) == ["mute:-100:5", "mute:-200:6"]
+
+
+def test_expired_mute_restores_permissions(bot, context, fake_bot):
+    bot.record("mute", chat_id="-100", user_id="5", until=0.0)
+    context.job = types.SimpleNamespace(data=(-100, 5))
+
+    asyncio.run(bot._expire_mute(context))
+
+    name, _, kwargs = fake_bot.calls[0]
+    assert name == "restrict_chat_member"
+    assert kwargs["permissions"] is keywordbot._UNMUTE_PERMS
+    assert bot.config["muted_users"] == {}
+
+
+def test_overdue_mute_survives_a_slow_jobqueue_start(bot, monkeypatch):
+    restricted = []
+
+    async def restrict_chat_member(self, chat_id, user_id, permissions, *args, **kwargs):
+        restricted.append((chat_id, user_id))
+        return True
+
+    monkeypatch.setattr(Bot, "restrict_chat_member", restrict_chat_member)
+    bot.record("mute", chat_id="-100", user_id="5", until=0.0)
+
+    async def main():
+        # post_init schedules overdue mutes before PTB starts the JobQueue; a bootstrap
+        # slower than APScheduler's default 1 s grace time must not drop them
+        bot.schedule_pending_unmutes()
+        await asyncio.sleep(1.5)
+        await bot.app.job_queue.start()
+        try:
+            for _ in range(50):
+                if not bot.config["muted_users"]:
+                    break
+                await asyncio.sleep(0.05)
+        finally:
+            await bot.app.job_queue.stop(wait=False)
+
+    asyncio.run(main())
+    assert restricted == [(-100, 5)]
+    assert bot.config["muted_users"] == {}
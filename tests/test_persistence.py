@@ -0,0 +1,115 @@
+import asyncio
+import os
+
+import orjson
+import pytest
+
+import keywordbot
+
+
+def reload(bot):
+    """Simulate a restart: drop the open journal and load everything back from disk"""
+    bot._journal.close()
+    return keywordbot.TopicKeywordBot("123:ABC")
+
+
+def populate(bot):
+    bot.record("add_keyword", chat_id="-100", topic_id="1", keyword="spam")
+    bot.record("add_keyword", chat_id="-100", topic_id="1", keyword="eggs")
+    bot.record("remove_keyword", chat_id="-100", topic_id="1", keyword="eggs")
+    bot.record("add_admin", user_id=7)
+    bot.record("mute", chat_id="-100", user_id="5", until=1234.5)
+    bot.record("flag", flagged_key="-100_10", message={"timestamp": "t", "chat_id": -100, "message_id": 10})
+
+
+def assert_populated(bot):
+    assert bot.config["topic_keywords"] == {"-100": {"1": {"spam"}}}
+    assert bot._resolved == {("-100", "1"): {"spam"}}
+    assert bot._admin_set == {7}
+    assert bot.config["muted_users"] == {"-100": {"5": 1234.5}}
+    assert list(bot.config["flagged_messages"]) == ["-100_10"]
+    assert bot._chat_filter.chat_ids == {-100}
+
+
+def test_journal_replays_on_restart(bot):
+    populate(bot)
+    assert_populated(reload(bot))
+
+
+def test_torn_last_journal_line_is_skipped(bot):
+    populate(bot)
+    bot._journal.write(b'{"op": "add_keyword", "chat_')
+    restarted = reload(bot)
+    assert_populated(restarted)
+
+    # The next entry must start on its own line, not be glued onto the torn fragment
+    restarted.record("add_admin", user_id=42)
+    again = reload(restarted)
+    assert again._admin_set == {7, 42}
+    with open(again.journal_file, "rb") as f:
+        assert b"chat_{" not in f.read()
+
+
+def test_torn_rotated_journal_is_repaired_before_merging(bot):
+    populate(bot)
+    bot._rotate_journal()
+    with open(bot.journal_file + ".1", "ab") as f:
+        f.write(b'{"op": "add_ke')
+    bot.record("add_admin", user_id=42)
+    # A second rotation appends the live journal onto the leftover .log.1
+    bot._rotate_journal()
+    assert reload(bot)._admin_set == {7, 42}
+
+
+def test_drop_torn_tail_keeps_complete_journals(tmp_path):
+    path = tmp_path / "journal"
+    for content in (b"", b'{"op": "clear_flagged"}\n'):
+        path.write_bytes(content)
+        keywordbot.TopicKeywordBot.drop_torn_tail(str(path))
+        assert path.read_bytes() == content
+    path.write_bytes(b"x" * 10000)
+    keywordbot.TopicKeywordBot.drop_torn_tail(str(path))
+    assert path.read_bytes() == b""
+
+
+def test_compaction_round_trip(bot):
+    populate(bot)
+    asyncio.run(bot.compact_config())
+
+    assert os.path.getsize(bot.journal_file) == 0
+    assert not os.path.exists(bot.journal_file + ".1")
+    with open(bot.config_file, "rb") as f:
+        on_disk = orjson.loads(f.read())
+    # Keyword sets are stored as sorted lists
+    assert on_disk["topic_keywords"] == {"-100": {"1": ["spam"]}}
+
+    assert_populated(reload(bot))
+
+
+def test_interrupted_compaction_is_replayed(bot):
+    populate(bot)
+    # A crash between rotating the journal and writing the snapshot leaves .log.1 behind
+    bot._rotate_journal()
+    bot.record("add_keyword", chat_id="-100", topic_id="2", keyword="ham")
+
+    restarted = reload(bot)
+    assert restarted._resolved[("-100", "2")] == {"ham"}
+    assert restarted._resolved[("-100", "1")] == {"spam"}
+
+
+def test_only_admin_changes_are_fsynced(bot, monkeypatch):
+    synced = []
+    monkeypatch.setattr(keywordbot.os, "fsync", lambda fd: synced.append(fd))
+    bot.record("add_keyword", chat_id="-100", topic_id="1", keyword="spam")
+    bot.record("mute", chat_id="-100", user_id="5", until=1.0)
+    bot.record("add_admin", user_id=7)
+    assert len(synced) == 2
+
+
+def test_corrupt_config_is_backed_up_and_refused(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "bot_config.json").write_bytes(b'{"topic_keywords": {')
+    with pytest.raises(RuntimeError):
+        keywordbot.TopicKeywordBot("123:ABC")
+    assert (tmp_path / "bot_config.json.bad").read_bytes() == b'{"topic_keywords": {'
+    assert (tmp_path / "bot_config.json").read_bytes() == b'{"topic_keywords": {'
@@ -0,0 +1,54 @@
+import asyncio
+
+
+def run_messages(bot, context, updates):
+    async def main():
+        for update in updates:
+            await bot.filter_message(update, context)
+        await asyncio.sleep(0)
+
+    asyncio.run(main())
+
+
+def test_forum_topic_root_is_not_indexed(bot, context, make_update):
+    bot.record("add_keyword", chat_id="-100", topic_id="7", keyword="spam")
+    run_messages(bot, context, [
+        make_update("hello", message_id=20, thread_id=7, reply_to=7, is_topic_message=True),
+    ])
+    assert ("-100", 7) not in bot._reply_index
+
+
+def test_reply_inside_forum_topic_is_indexed(bot, context, make_update):
+    bot.record("add_keyword", chat_id="-100", topic_id="7", keyword="spam")
+    run_messages(bot, context, [
+        make_update("hello", message_id=21, thread_id=7, reply_to=20, is_topic_message=True),
+    ])
+    assert bot._reply_index[("-100", 20)] == [21]
+
+
+def test_direct_reply_in_plain_supergroup_is_indexed(bot, context, make_update):
+    # Outside topics Telegram sets message_thread_id to the reply chain's root, which for a
+    # direct reply is the replied-to message itself
+    bot.record("add_keyword", chat_id="-100", topic_id="1", keyword="spam")
+    run_messages(bot, context, [
+        make_update("hello", message_id=31, thread_id=30, reply_to=30),
+    ])
+    assert bot._reply_index[("-100", 30)] == [31]
+
+
+def test_deleting_a_message_takes_its_indexed_replies(bot, context, fake_bot):
+    bot.index_reply("-100", 30, 31)
+    bot.index_reply("-100", 30, 32)
+
+    asyncio.run(bot.delete_message_and_replies(-100, 30, context))
+
+    assert sorted(fake_bot.deleted()) == [30, 31, 32]
+    assert ("-100", 30) not in bot._reply_index
+    assert "-100_30" in bot.config["flagged_messages"]
+
+
+def test_reply_index_evicts_oldest_parent(bot, monkeypatch):
+    monkeypatch.setattr("keywordbot.REPLY_INDEX_SIZE", 2)
+    for parent in (1, 2, 3):
+        bot.index_reply("-100", parent, parent + 100)
+    assert list(bot._reply_index) == [("-100", 2), ("-100", 3)]